@@ -7,7 +7,21 @@ to create a comprehensive database for the OBD-II application.
 import re
 import json
 import os
-from collections import defaultdict
+import mmap
+import functools
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+
+try:
+    import orjson  # Optional C-level JSON encoder, much faster for the full database
+except ImportError:
+    orjson = None
+
+try:
+    import re2  # Optional linear-time regex engine, immune to catastrophic backtracking
+except ImportError:
+    re2 = None
 
 # Define the input and output files
 INPUT_FILES = {
@@ -18,70 +32,101 @@ INPUT_FILES = {
 
 OUTPUT_FILE = '/home/ubuntu/obd_guide_enhanced/dtc_database/dtc_database.json'
 
-# Regular expressions for parsing different formats
-DTC_PATTERN = r'P(\d{4})'
-DTC_TITLE_PATTERN = r'P(\d{4})\s*-\s*(.+?)(?:\n|$)'
-DESCRIPTION_PATTERN = r'Description:\s*(.+?)(?:\n\s*Possible|\n\s*Diagnostic|\n\s*Application|\n\s*$)'
-POSSIBLE_CAUSES_PATTERN = r'Possible\s+Causes:\s*(.+?)(?:\n\s*Diagnostic|\n\s*Application|\n\s*$)'
-DIAGNOSTIC_AIDS_PATTERN = r'Diagnostic\s+Aids:\s*(.+?)(?:\n\s*Application|\n\s*$)'
+@functools.lru_cache(maxsize=256)
+def _re(pattern, flags=0):
+    """Compile a regex once per pattern/flags pair, bypassing re's internal cache.
+    
+    Patterns are compiled with re2 when it is installed and accepts them; flags
+    should be written inline (e.g. "(?m)") for re2 to be used.
+    """
+    if re2 is not None and not flags:
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern, flags)
 
-# Simple format from new_2007_codes.txt
-SIMPLE_DTC_PATTERN = r'P(\d{4})\s+(.+?)(?:\n|$)'
+# Regular expressions for parsing different formats, compiled once at import.
+# The primary source is scanned as bytes straight from a memory map.
+DTC_HEADER_RE = _re(rb'P(\d{4})\s*-[ \t]*([^\n]*)')
+SECTION_RE = _re(rb'(?m)^\s*(Description|Possible\s+Causes|Diagnostic\s+Aids|Application)\s*:[ \t]*')
+# clean_text must collapse Unicode whitespace (NBSP, \v) from PDF text, which
+# re2's ASCII-only \s would leave alone, so this one always uses re
+WHITESPACE_RE = re.compile(r'\s+')
+
+# DTC categories keyed by the first digit after the P
+DTC_CATEGORIES = {
+    '0': 'Generic OBD-II',
+    '1': 'Manufacturer Specific',
+    '2': 'Generic OBD-II (includes P0XXX codes)',
+    '3': 'Generic OBD-II and Manufacturer Specific'
+}
+
+# Category for each digit 0-9, indexed by ord(digit) - ord('0')
+_DIGIT_TO_CATEGORY = tuple(DTC_CATEGORIES.get(str(digit), 'Unknown') for digit in range(10))
+
+@dataclass(slots=True)
+class DTCRecord:
+    """A single Diagnostic Trouble Code entry in the database."""
+    code: str
+    title: str
+    description: str
+    possible_causes: list = field(default_factory=list)
+    diagnostic_aids: str = ''
+    source: str = ''
 
 def clean_text(text):
     """Clean up text by removing extra whitespace and normalizing line endings."""
     if not text:
         return ""
     # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_RE.sub(' ', text)
     # Remove leading/trailing whitespace
     return text.strip()
 
+def split_sections(block):
+    """Split a raw DTC block into its decoded sections, keyed by the label's first word."""
+    labels = list(SECTION_RE.finditer(block))
+    sections = {}
+    
+    # Each section runs from the end of its label to the start of the next one
+    for i, label in enumerate(labels):
+        name = label.group(1).split()[0].lower().decode('ascii')
+        if name not in sections:
+            section_end = labels[i + 1].start() if i + 1 < len(labels) else len(block)
+            sections[name] = block[label.end():section_end].decode('utf-8')
+    
+    return sections
+
 def extract_dtcs_from_primary():
     """Extract DTCs from the primary source (dtc_codes_extracted.txt)."""
     dtcs = {}
     
     try:
-        with open(INPUT_FILES['primary'], 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Find all DTC blocks
-        blocks = re.split(r'P\d{4}\s*-', content)
-        if blocks:
-            blocks = blocks[1:]  # Skip the header
+        # Map the file instead of reading it into a str; only the captured
+        # groups that end up in the database are decoded
+        with open(INPUT_FILES['primary'], 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            # Locate every DTC header in a single pass; each block runs from the
+            # end of its header line to the start of the next header
+            headers = list(DTC_HEADER_RE.finditer(content))
             
-        # Process each block
-        for i, block in enumerate(blocks):
-            # Add back the P code that was removed in the split
-            match = re.search(DTC_PATTERN, content)
-            if match and i < len(re.findall(r'P\d{4}\s*-', content)):
-                code = 'P' + re.findall(r'P(\d{4})\s*-', content)[i]
-                
-                # Extract title
-                title_match = re.search(r'^(.+?)(?:\n|$)', block)
-                title = title_match.group(1).strip() if title_match else ""
-                
-                # Extract description
-                desc_match = re.search(DESCRIPTION_PATTERN, block)
-                description = clean_text(desc_match.group(1)) if desc_match else ""
-                
-                # Extract possible causes
-                causes_match = re.search(POSSIBLE_CAUSES_PATTERN, block)
-                causes = clean_text(causes_match.group(1)) if causes_match else ""
+            # Process each block
+            for i, header in enumerate(headers):
+                code = 'P' + header.group(1).decode('ascii')
+                title = header.group(2).decode('utf-8').strip()
+                block_end = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+                block = content[header.end():block_end]
                 
-                # Extract diagnostic aids
-                aids_match = re.search(DIAGNOSTIC_AIDS_PATTERN, block)
-                aids = clean_text(aids_match.group(1)) if aids_match else ""
+                sections = split_sections(block)
+                description = clean_text(sections.get('description'))
+                # Split causes on the raw lines before whitespace is normalised
+                raw_causes = sections.get('possible', '')
+                causes = [clean_text(cause) for cause in raw_causes.split('\n') if cause.strip()]
+                aids = clean_text(sections.get('diagnostic'))
                 
                 # Store the DTC information
-                dtcs[code] = {
-                    'code': code,
-                    'title': title,
-                    'description': description,
-                    'possible_causes': causes.split('\n'),
-                    'diagnostic_aids': aids,
-                    'source': 'primary'
-                }
+                dtcs[code] = DTCRecord(code, title, description, causes, aids, 'primary')
     except Exception as e:
         print(f"Error processing primary source: {e}")
     
@@ -93,24 +138,21 @@ def extract_dtcs_from_new_2007():
     
     try:
         with open(INPUT_FILES['new_2007'], 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Find all DTCs in the simple format
-        matches = re.finditer(r'P(\d{4})\s+(.+?)(?:\n|$)', content)
-        
-        for match in matches:
-            code = 'P' + match.group(1)
-            description = clean_text(match.group(2))
-            
-            # Store the DTC information
-            dtcs[code] = {
-                'code': code,
-                'title': description,
-                'description': description,
-                'possible_causes': [],
-                'diagnostic_aids': '',
-                'source': 'new_2007'
-            }
+            # The simple format is one "Pdddd  description" entry per line;
+            # split each line into its two fields and check the code field
+            for line in f:
+                fields = line.split(None, 1)
+                if len(fields) < 2:
+                    continue
+                
+                code, description = fields
+                if len(code) != 5 or code[0] != 'P' or not (code[1:].isascii() and code[1:].isdigit()):
+                    continue
+                
+                description = clean_text(description)
+                
+                # Store the DTC information
+                dtcs[code] = DTCRecord(code, description, description, source='new_2007')
     except Exception as e:
         print(f"Error processing 2007 source: {e}")
     
@@ -123,67 +165,111 @@ def extract_dtcs_from_rac():
     return {}
 
 def merge_dtc_databases(primary_dtcs, new_2007_dtcs, rac_dtcs):
-    """Merge DTC databases from different sources, prioritizing more detailed information."""
-    merged_dtcs = {}
+    """Merge DTC databases from different sources, prioritizing more detailed information.
     
-    # Start with primary DTCs
-    merged_dtcs.update(primary_dtcs)
+    The primary dict is updated in place and returned.
+    """
+    # Start with primary DTCs, merging the other sources into it in place
+    merged_dtcs = primary_dtcs
+    extra_sources = {}
     
     # Add or update with 2007 DTCs
     for code, dtc_info in new_2007_dtcs.items():
-        if code in merged_dtcs:
-            # If the primary source doesn't have a description, use the one from 2007
-            if not merged_dtcs[code]['description'] and dtc_info['description']:
-                merged_dtcs[code]['description'] = dtc_info['description']
-            
-            # Update the sources list
-            merged_dtcs[code]['source'] = f"{merged_dtcs[code]['source']},new_2007"
-        else:
+        current = merged_dtcs.get(code)
+        if current is None:
             # Add new DTC
             merged_dtcs[code] = dtc_info
+            continue
+        
+        # If the primary source doesn't have a description, use the one from 2007
+        if not current.description and dtc_info.description:
+            current.description = dtc_info.description
+        
+        # Update the sources list
+        extra_sources.setdefault(code, [current.source]).append('new_2007')
     
     # Add or update with RAC DTCs
     for code, dtc_info in rac_dtcs.items():
-        if code in merged_dtcs:
-            # Update the sources list
-            merged_dtcs[code]['source'] = f"{merged_dtcs[code]['source']},rac"
-        else:
+        current = merged_dtcs.get(code)
+        if current is None:
             # Add new DTC
             merged_dtcs[code] = dtc_info
+            continue
+        
+        # Update the sources list
+        extra_sources.setdefault(code, [current.source]).append('rac')
+    
+    # Join the accumulated sources once per DTC
+    for code, sources in extra_sources.items():
+        merged_dtcs[code].source = ','.join(sources)
     
     return merged_dtcs
 
-def categorize_dtcs(dtcs):
-    """Categorize DTCs by their first digit after the P."""
-    categories = {
-        '0': 'Generic OBD-II',
-        '1': 'Manufacturer Specific',
-        '2': 'Generic OBD-II (includes P0XXX codes)',
-        '3': 'Generic OBD-II and Manufacturer Specific'
-    }
+def categorize_dtcs(codes):
+    """Categorize DTCs by their first digit after the P, as indices into the codes list."""
+    # Parsed codes are always P followed by four digits
+    def category_of(index):
+        return _DIGIT_TO_CATEGORY[ord(codes[index].code[1]) - 48]
     
-    categorized = defaultdict(list)
+    # Sort by category once so each category is built in one contiguous run;
+    # the sort is stable, so indices stay in order within a category
+    indices = sorted(
+        (index for index, dtc in enumerate(codes) if dtc.code.startswith('P')),
+        key=category_of
+    )
     
-    for code, info in dtcs.items():
-        if code.startswith('P'):
-            category_digit = code[1]
-            category = categories.get(category_digit, 'Unknown')
-            categorized[category].append(info)
+    return {category: list(group) for category, group in groupby(indices, key=category_of)}
+
+def encode_json(value):
+    """Encode a value as compact UTF-8 JSON, converting DTC records as they are met."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=asdict).encode('utf-8')
+
+def write_dtc_database(path, codes, categorized):
+    """Stream the DTC database to a JSON file one record at a time.
+    
+    Each DTC is stored once in 'codes' and 'categorized' refers to it by index.
+    The combined structure is never built in memory, and each record is
+    written on its own line.
+    """
+    metadata = {
+        'total_codes': len(codes),
+        'sources': ['primary', 'new_2007', 'rac'],
+        'categories': list(categorized.keys())
+    }
     
-    return dict(categorized)
+    with open(path, 'wb') as f:
+        f.write(b'{\n"metadata": ')
+        f.write(encode_json(metadata))
+        
+        f.write(b',\n"codes": [')
+        for i, record in enumerate(codes):
+            f.write(b'\n' if i == 0 else b',\n')
+            f.write(encode_json(record))
+        
+        f.write(b'\n],\n"categorized": {')
+        for i, (category, indices) in enumerate(categorized.items()):
+            f.write(b'\n' if i == 0 else b',\n')
+            f.write(encode_json(category) + b': ' + encode_json(indices))
+        f.write(b'\n}\n}\n')
 
 def main():
     """Main function to extract and process DTCs."""
-    print("Extracting DTCs from primary source...")
-    primary_dtcs = extract_dtcs_from_primary()
+    # The sources are independent, so read and parse them concurrently
+    print("Extracting DTCs from primary source, 2007 updated codes and RAC source...")
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        primary_future = executor.submit(extract_dtcs_from_primary)
+        new_2007_future = executor.submit(extract_dtcs_from_new_2007)
+        rac_future = executor.submit(extract_dtcs_from_rac)
+    
+    primary_dtcs = primary_future.result()
     print(f"Extracted {len(primary_dtcs)} DTCs from primary source.")
     
-    print("Extracting DTCs from 2007 updated codes...")
-    new_2007_dtcs = extract_dtcs_from_new_2007()
+    new_2007_dtcs = new_2007_future.result()
     print(f"Extracted {len(new_2007_dtcs)} DTCs from 2007 updated codes.")
     
-    print("Extracting DTCs from RAC source...")
-    rac_dtcs = extract_dtcs_from_rac()
+    rac_dtcs = rac_future.result()
     print(f"Extracted {len(rac_dtcs)} DTCs from RAC source.")
     
     print("Merging DTC databases...")
@@ -191,22 +277,11 @@ def main():
     print(f"Merged database contains {len(merged_dtcs)} unique DTCs.")
     
     print("Categorizing DTCs...")
-    categorized_dtcs = categorize_dtcs(merged_dtcs)
-    
-    # Create the final database structure
-    dtc_database = {
-        'metadata': {
-            'total_codes': len(merged_dtcs),
-            'sources': ['primary', 'new_2007', 'rac'],
-            'categories': list(categorized_dtcs.keys())
-        },
-        'codes': list(merged_dtcs.values()),
-        'categorized': categorized_dtcs
-    }
+    codes = list(merged_dtcs.values())
+    categorized_dtcs = categorize_dtcs(codes)
     
     # Save the database to a JSON file
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(dtc_database, f, indent=2)
+    write_dtc_database(OUTPUT_FILE, codes, categorized_dtcs)
     
     print(f"DTC database saved to {OUTPUT_FILE}")
 
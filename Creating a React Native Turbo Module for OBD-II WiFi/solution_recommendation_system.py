@@ -8,6 +8,7 @@ import json
 import re
 import os
 from collections import defaultdict
+from types import MappingProxyType
 
 # Define the input and output files
 DTC_DATABASE_FILE = '/home/ubuntu/obd_guide_enhanced/dtc_database/dtc_database.json'
@@ -32,6 +33,7 @@ SYSTEM_CATEGORIES = {
     'P0E': 'Hybrid Propulsion',
     'P0F': 'Hybrid Propulsion',
 }
+SYSTEM_CATEGORIES = MappingProxyType(SYSTEM_CATEGORIES)
 
 # Define common repair procedures for different categories
 COMMON_REPAIRS = {
@@ -312,6 +314,26 @@ COMMON_REPAIRS = {
     ]
 }
 
+# Freeze the repair procedures so they can be shared by reference: each
+# procedure becomes a read-only mapping and every list becomes a tuple
+COMMON_REPAIRS = MappingProxyType({
+    category: tuple(
+        MappingProxyType({key: tuple(value) if isinstance(value, list) else value for key, value in procedure.items()})
+        for procedure in procedures
+    )
+    for category, procedures in COMMON_REPAIRS.items()
+})
+
+# Repair catalog entry used when a category has no repairs of its own
+DEFAULT_REPAIR_CATEGORY = 'Computer Output Circuit'
+_GENERAL_SYSTEM_REPAIRS = ('General', DEFAULT_REPAIR_CATEGORY)
+
+# (system category, repair catalog key) for P0 codes keyed by the third character of the code
+_THIRD_TO_SYSTEM_REPAIRS = {
+    prefix[2]: (category, category if category in COMMON_REPAIRS else DEFAULT_REPAIR_CATEGORY)
+    for prefix, category in SYSTEM_CATEGORIES.items()
+}
+
 def load_dtc_database():
     """Load the DTC database from the JSON file."""
     try:
@@ -333,6 +355,8 @@ def generate_solution_recommendations():
             'total_codes': dtc_database['metadata']['total_codes'],
             'total_solutions': 0
         },
+        # Repair procedures are stored once here; solutions refer to them by key
+        'repair_catalog': COMMON_REPAIRS,
         'solutions': {}
     }
     
@@ -344,17 +368,43 @@ def generate_solution_recommendations():
         if not code.startswith('P'):
             continue
         
-        # Determine the system category
-        category_code = code[0:3]  # e.g., P00, P01, etc.
-        system_category = SYSTEM_CATEGORIES.get(category_code, 'General')
-        
-        # Get common repairs for this category
-        common_repairs = COMMON_REPAIRS.get(system_category, COMMON_REPAIRS.get('Computer Output Circuit', []))
+        # Determine the system category and its repair catalog entry; only P0 codes have one
+        if code[1] == '0':
+            system_category, repair_ref = _THIRD_TO_SYSTEM_REPAIRS.get(code[2], _GENERAL_SYSTEM_REPAIRS)
+        else:
+            system_category, repair_ref = _GENERAL_SYSTEM_REPAIRS
         
         # Extract possible causes from the DTC
         possible_causes = []
         if 'possible_causes' in dtc and dtc['possible_causes']:
             if isinstance(dtc['possible_causes'], list):
                 possible_causes = dtc['possible_causes']
-           
-(Content truncated due to size limit. Use line ranges to read in chunks)
\ No newline at end of file
+            else:
+                possible_causes = [dtc['possible_causes']]
+        
+        # Create the solution entry for this DTC
+        solution_database['solutions'][code] = {
+            'code': code,
+            'title': dtc.get('title', ''),
+            'description': dtc.get('description', ''),
+            'system_category': system_category,
+            'possible_causes': possible_causes,
+            'repair_ref': repair_ref
+        }
+        solution_database['metadata']['total_solutions'] += 1
+    
+    # Save the solution database to a JSON file
+    with open(SOLUTION_DATABASE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(solution_database, f, indent=2, default=dict)
+    
+    print(f"Generated {solution_database['metadata']['total_solutions']} solutions.")
+    print(f"Solution database saved to {SOLUTION_DATABASE_FILE}")
+    return solution_database
+
+def main():
+    """Main function to generate solution recommendations."""
+    print("Generating solution recommendations...")
+    generate_solution_recommendations()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
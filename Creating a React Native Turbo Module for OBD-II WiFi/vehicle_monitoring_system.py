@@ -4,180 +4,217 @@ Vehicle Monitoring System - Provides continuous monitoring of vehicle parameters
 and health status through the OBD-II connection.
 """
 
+import os
 import json
+import mmap
+import struct
+import base64
+import functools
 import time
+import heapq
 import math
 import random  # For simulation purposes only
+import queue
+import threading
+from array import array
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from types import MappingProxyType
+
+try:
+    import orjson  # Optional, much faster JSON parsing and encoding
+except ImportError:
+    orjson = None
+
+@dataclass(slots=True, frozen=True)
+class ParamInfo:
+    """Definition of a monitored parameter and its thresholds."""
+    pid: str
+    name: str
+    unit: str
+    min_normal: float | None
+    max_normal: float | None
+    warning_threshold: float | None
+    critical_threshold: float | None
+    priority: str
+    polling_rate: int  # seconds
+    description: str = ''
 
 # Define monitoring parameters and thresholds
 MONITORING_PARAMETERS = {
     'ENGINE_PARAMETERS': {
-        'RPM': {
-            'pid': '010C',
-            'name': 'Engine RPM',
-            'unit': 'rpm',
-            'min_normal': 600,
-            'max_normal': 6500,
-            'warning_threshold': 6000,
-            'critical_threshold': 6500,
-            'priority': 'high',
-            'polling_rate': 1,  # seconds
-            'description': 'Engine revolutions per minute'
-        },
-        'LOAD': {
-            'pid': '0104',
-            'name': 'Engine Load',
-            'unit': '%',
-            'min_normal': 0,
-            'max_normal': 85,
-            'warning_threshold': 85,
-            'critical_threshold': 95,
-            'priority': 'medium',
-            'polling_rate': 2,
-            'description': 'Calculated engine load value'
-        },
-        'COOLANT_TEMP': {
-            'pid': '0105',
-            'name': 'Coolant Temperature',
-            'unit': '°C',
-            'min_normal': 75,
-            'max_normal': 105,
-            'warning_threshold': 105,
-            'critical_threshold': 115,
-            'priority': 'high',
-            'polling_rate': 5,
-            'description': 'Engine coolant temperature'
-        },
-        'INTAKE_TEMP': {
-            'pid': '010F',
-            'name': 'Intake Air Temperature',
-            'unit': '°C',
-            'min_normal': -10,
-            'max_normal': 70,
-            'warning_threshold': 70,
-            'critical_threshold': 85,
-            'priority': 'low',
-            'polling_rate': 10,
-            'description': 'Intake air temperature'
-        },
-        'MAF': {
-            'pid': '0110',
-            'name': 'MAF Air Flow Rate',
-            'unit': 'g/s',
-            'min_normal': 0,
-            'max_normal': 250,
-            'warning_threshold': None,
-            'critical_threshold': None,
-            'priority': 'low',
-            'polling_rate': 5,
-            'description': 'Mass air flow sensor air flow rate'
-        },
-        'THROTTLE': {
-            'pid': '0111',
-            'name': 'Throttle Position',
-            'unit': '%',
-            'min_normal': 0,
-            'max_normal': 100,
-            'warning_threshold': None,
-            'critical_threshold': None,
-            'priority': 'medium',
-            'polling_rate': 2,
-            'description': 'Absolute throttle position'
-        }
+        'RPM': ParamInfo(
+            pid='010C',
+            name='Engine RPM',
+            unit='rpm',
+            min_normal=600,
+            max_normal=6500,
+            warning_threshold=6000,
+            critical_threshold=6500,
+            priority='high',
+            polling_rate=1,  # seconds
+            description='Engine revolutions per minute'
+        ),
+        'LOAD': ParamInfo(
+            pid='0104',
+            name='Engine Load',
+            unit='%',
+            min_normal=0,
+            max_normal=85,
+            warning_threshold=85,
+            critical_threshold=95,
+            priority='medium',
+            polling_rate=2,
+            description='Calculated engine load value'
+        ),
+        'COOLANT_TEMP': ParamInfo(
+            pid='0105',
+            name='Coolant Temperature',
+            unit='°C',
+            min_normal=75,
+            max_normal=105,
+            warning_threshold=105,
+            critical_threshold=115,
+            priority='high',
+            polling_rate=5,
+            description='Engine coolant temperature'
+        ),
+        'INTAKE_TEMP': ParamInfo(
+            pid='010F',
+            name='Intake Air Temperature',
+            unit='°C',
+            min_normal=-10,
+            max_normal=70,
+            warning_threshold=70,
+            critical_threshold=85,
+            priority='low',
+            polling_rate=10,
+            description='Intake air temperature'
+        ),
+        'MAF': ParamInfo(
+            pid='0110',
+            name='MAF Air Flow Rate',
+            unit='g/s',
+            min_normal=0,
+            max_normal=250,
+            warning_threshold=None,
+            critical_threshold=None,
+            priority='low',
+            polling_rate=5,
+            description='Mass air flow sensor air flow rate'
+        ),
+        'THROTTLE': ParamInfo(
+            pid='0111',
+            name='Throttle Position',
+            unit='%',
+            min_normal=0,
+            max_normal=100,
+            warning_threshold=None,
+            critical_threshold=None,
+            priority='medium',
+            polling_rate=2,
+            description='Absolute throttle position'
+        )
     },
     'VEHICLE_PARAMETERS': {
-        'SPEED': {
-            'pid': '010D',
-            'name': 'Vehicle Speed',
-            'unit': 'km/h',
-            'min_normal': 0,
-            'max_normal': 200,
-            'warning_threshold': None,
-            'critical_threshold': None,
-            'priority': 'high',
-            'polling_rate': 1,
-            'description': 'Vehicle speed'
-        },
-        'RUNTIME': {
-            'pid': '011F',
-            'name': 'Run Time',
-            'unit': 'seconds',
-            'min_normal': 0,
-            'max_normal': None,
-            'warning_threshold': None,
-            'critical_threshold': None,
-            'priority': 'low',
-            'polling_rate': 60,
-            'description': 'Run time since engine start'
-        }
+        'SPEED': ParamInfo(
+            pid='010D',
+            name='Vehicle Speed',
+            unit='km/h',
+            min_normal=0,
+            max_normal=200,
+            warning_threshold=None,
+            critical_threshold=None,
+            priority='high',
+            polling_rate=1,
+            description='Vehicle speed'
+        ),
+        'RUNTIME': ParamInfo(
+            pid='011F',
+            name='Run Time',
+            unit='seconds',
+            min_normal=0,
+            max_normal=None,
+            warning_threshold=None,
+            critical_threshold=None,
+            priority='low',
+            polling_rate=60,
+            description='Run time since engine start'
+        )
     },
     'FUEL_PARAMETERS': {
-        'FUEL_PRESSURE': {
-            'pid': '010A',
-            'name': 'Fuel Pressure',
-            'unit': 'kPa',
-            'min_normal': 350,
-            'max_normal': 500,
-            'warning_threshold': 300,
-            'critical_threshold': 250,
-            'priority': 'medium',
-            'polling_rate': 5,
-            'description': 'Fuel pressure'
-        },
-        'FUEL_LEVEL': {
-            'pid': '012F',
-            'name': 'Fuel Level',
-            'unit': '%',
-            'min_normal': 10,
-            'max_normal': 100,
-            'warning_threshold': 10,
-            'critical_threshold': 5,
-            'priority': 'medium',
-            'polling_rate': 30,
-            'description': 'Fuel tank level input'
-        },
-        'FUEL_RATE': {
-            'pid': '015E',
-            'name': 'Fuel Rate',
-            'unit': 'L/h',
-            'min_normal': 0,
-            'max_normal': 30,
-            'warning_threshold': None,
-            'critical_threshold': None,
-            'priority': 'low',
-            'polling_rate': 5,
-            'description': 'Engine fuel rate'
-        }
+        'FUEL_PRESSURE': ParamInfo(
+            pid='010A',
+            name='Fuel Pressure',
+            unit='kPa',
+            min_normal=350,
+            max_normal=500,
+            warning_threshold=300,
+            critical_threshold=250,
+            priority='medium',
+            polling_rate=5,
+            description='Fuel pressure'
+        ),
+        'FUEL_LEVEL': ParamInfo(
+            pid='012F',
+            name='Fuel Level',
+            unit='%',
+            min_normal=10,
+            max_normal=100,
+            warning_threshold=10,
+            critical_threshold=5,
+            priority='medium',
+            polling_rate=30,
+            description='Fuel tank level input'
+        ),
+        'FUEL_RATE': ParamInfo(
+            pid='015E',
+            name='Fuel Rate',
+            unit='L/h',
+            min_normal=0,
+            max_normal=30,
+            warning_threshold=None,
+            critical_threshold=None,
+            priority='low',
+            polling_rate=5,
+            description='Engine fuel rate'
+        )
     },
     'EMISSIONS_PARAMETERS': {
-        'O2_VOLTAGE': {
-            'pid': '0114',
-            'name': 'O2 Sensor Voltage',
-            'unit': 'V',
-            'min_normal': 0,
-            'max_normal': 1.1,
-            'warning_threshold': None,
-            'critical_threshold': None,
-            'priority': 'low',
-            'polling_rate': 5,
-            'description': 'O2 sensor voltage'
-        },
-        'CATALYST_TEMP': {
-            'pid': '013C',
-            'name': 'Catalyst Temperature',
-            'unit': '°C',
-            'min_normal': 300,
-            'max_normal': 900,
-            'warning_threshold': 900,
-            'critical_threshold': 950,
-            'priority': 'medium',
-            'polling_rate': 10,
-            'description': 'Catalyst temperature'
-        }
+        'O2_VOLTAGE': ParamInfo(
+            pid='0114',
+            name='O2 Sensor Voltage',
+            unit='V',
+            min_normal=0,
+            max_normal=1.1,
+            warning_threshold=None,
+            critical_threshold=None,
+            priority='low',
+            polling_rate=5,
+            description='O2 sensor voltage'
+        ),
+        'CATALYST_TEMP': ParamInfo(
+            pid='013C',
+            name='Catalyst Temperature',
+            unit='°C',
+            min_normal=300,
+            max_normal=900,
+            warning_threshold=900,
+            critical_threshold=950,
+            priority='medium',
+            polling_rate=10,
+            description='Catalyst temperature'
+        )
     }
 }
 
+# The parameter definitions are read-only at runtime
+MONITORING_PARAMETERS = MappingProxyType({
+    category: MappingProxyType(params) for category, params in MONITORING_PARAMETERS.items()
+})
+
 # Define monitoring profiles
 MONITORING_PROFILES = {
     'STANDARD': {
@@ -247,6 +284,470 @@ MONITORING_PROFILES = {
     }
 }
 
+# Number of samples kept in each parameter's history ring buffer
+HISTORY_SIZE = 3600
+
+# Seconds between full monitoring data snapshots while a session is running
+CHECKPOINT_INTERVAL = 60
+CHECKPOINT_INTERVAL_NS = CHECKPOINT_INTERVAL * 1_000_000_000
+
+# Most recent alerts and DTCs kept in memory; older ones remain in the monitoring log
+ALERT_HISTORY_SIZE = 1024
+
+# Queued to the monitoring log writer to make it flush and exit
+_WRITER_STOP = object()
+
+# ELM327 adapters answer at most six PIDs of one mode in a single request
+OBD_MAX_PIDS_PER_REQUEST = 6
+
+# Parameter status codes returned by classify_parameter_value
+STATUS_NORMAL = 0
+STATUS_ABNORMAL = 1
+STATUS_WARNING = 2
+STATUS_CRITICAL = 3
+STATUS_NAMES = ('normal', 'abnormal', 'warning', 'critical')
+STATUS_UNKNOWN = -1
+
+# Lowest status code that raises an alert for each profile alert_threshold
+ALERT_LEVELS = {
+    'warning': STATUS_WARNING,
+    'critical': STATUS_CRITICAL
+}
+
+# Every 'CATEGORY.PARAM' path gets an ordinal index into the flat parameter tables
+PARAMETER_PATHS = tuple(
+    f'{category}.{param}'
+    for category, params in MONITORING_PARAMETERS.items()
+    for param in params
+)
+PARAMETER_INDEX = {path: index for index, path in enumerate(PARAMETER_PATHS)}
+_PARAMETER_INFOS = tuple(
+    MONITORING_PARAMETERS[category][param]
+    for category, param in (path.split('.') for path in PARAMETER_PATHS)
+)
+
+# Column views of the parameter table, aligned with PARAMETER_PATHS, so code that
+# reads one field across parameters walks a flat sequence instead of nested dicts
+PARAMETER_PIDS = tuple(info.pid for info in _PARAMETER_INFOS)
+PARAMETER_NAMES = tuple(info.name for info in _PARAMETER_INFOS)
+PARAMETER_UNITS = tuple(info.unit for info in _PARAMETER_INFOS)
+POLLING_RATES = array('H', (info.polling_rate for info in _PARAMETER_INFOS))
+
+def _pack_thresholds(param_info):
+    """Pack a parameter's ranges into (min_normal, max_normal, warn_low, warn_high, crit_low, crit_high)."""
+    inf = math.inf
+    min_normal = param_info.min_normal if param_info.min_normal is not None else -inf
+    max_normal = param_info.max_normal if param_info.max_normal is not None else inf
+    warning = param_info.warning_threshold
+    critical = param_info.critical_threshold
+    
+    # Thresholds below the normal range (critical under warning) trigger on low values
+    if warning is not None and critical is not None and critical < warning:
+        return (min_normal, max_normal, warning, inf, critical, inf)
+    return (
+        min_normal,
+        max_normal,
+        -inf,
+        warning if warning is not None else inf,
+        -inf,
+        critical if critical is not None else inf
+    )
+
+PARAMETER_THRESHOLDS = tuple(_pack_thresholds(info) for info in _PARAMETER_INFOS)
+
+@dataclass(slots=True, frozen=True)
+class PolledParam:
+    """A parameter resolved to everything the polling loop needs."""
+    path: str
+    index: int
+    name: str
+    pid: str
+    unit: str
+    polling_rate: int
+    polling_rate_ns: int
+    thresholds: tuple
+
+POLLED_PARAMS = tuple(
+    PolledParam(path, index, PARAMETER_NAMES[index], PARAMETER_PIDS[index], PARAMETER_UNITS[index],
+                POLLING_RATES[index], POLLING_RATES[index] * 1_000_000_000, PARAMETER_THRESHOLDS[index])
+    for index, path in enumerate(PARAMETER_PATHS)
+)
+
+# Replace each profile's 'CATEGORY.PARAM' strings with their resolved PolledParam entries
+for _profile in MONITORING_PROFILES.values():
+    _profile['parameters'] = tuple(POLLED_PARAMS[PARAMETER_INDEX[path]] for path in _profile['parameters'])
+del _profile
+
+# Valid profile names, checked before a session changes any state
+_PROFILE_NAMES = frozenset(MONITORING_PROFILES)
+
+def classify_parameter_value(index, value):
+    """Classify a value for the parameter at the given index, returning a STATUS_* code."""
+    return classify_thresholds(PARAMETER_THRESHOLDS[index], value)
+
+def classify_thresholds(thresholds, value):
+    """Classify a value against a packed thresholds tuple, returning a STATUS_* code."""
+    min_normal, max_normal, warn_low, warn_high, crit_low, crit_high = thresholds
+    if value <= crit_low or value >= crit_high:
+        return STATUS_CRITICAL
+    if value <= warn_low or value >= warn_high:
+        return STATUS_WARNING
+    if value < min_normal or value > max_normal:
+        return STATUS_ABNORMAL
+    return STATUS_NORMAL
+
+def classify_values(thresholds, values):
+    """Classify a batch of readings against their packed thresholds in one pass.
+    
+    Returns an array of STATUS_* codes; missing (None or NaN) readings are STATUS_UNKNOWN.
+    """
+    return array('b', [
+        classify_thresholds(param_thresholds, value) if value is not None and value == value else STATUS_UNKNOWN
+        for param_thresholds, value in zip(thresholds, values)
+    ])
+
+def _read_json(path):
+    """Load a JSON file, using orjson when it is available."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_json(path, data):
+    """Write data to a JSON file, using orjson when it is available."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+# Packed DTC database: the index file holds the header blob length followed by
+# one (code, offset, length) record per code, pointing into the data file, which
+# holds a header JSON object followed by one compact JSON blob per code. The
+# header is the database's top level with 'codes' set to null, so every other
+# key (metadata, categorized, ...) survives packing. Codes are stored in fixed
+# 5-byte fields, so only 5-character ASCII codes can be packed
+DTC_CODE_LENGTH = 5
+_DTC_INDEX_HEADER = struct.Struct('<I')
+_DTC_INDEX_RECORD = struct.Struct(f'<{DTC_CODE_LENGTH}sII')
+
+def _encode_json(data):
+    """Encode data as compact JSON bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _decode_json(data):
+    """Decode JSON bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def convert_dtc_database(dtc_database, index_path, data_path):
+    """Write a loaded DTC database out as a packed index and data file pair.
+    
+    Raises ValueError if any code is not a 5-character ASCII string; nothing is
+    left on disk when the conversion fails.
+    """
+    # The fixed-width code field would truncate or pad other codes, so they could collide
+    for entry in dtc_database['codes']:
+        code = entry['code']
+        if len(code) != DTC_CODE_LENGTH or not code.isascii():
+            raise ValueError(f"Cannot pack DTC code {code!r}: expected {DTC_CODE_LENGTH} ASCII characters")
+    
+    # 'codes' stays in the header as a placeholder so key order is preserved
+    header = _encode_json({key: None if key == 'codes' else value for key, value in dtc_database.items()})
+    offset = len(header)
+    
+    # Write to temporary files and swap them in, the index last, so a partial
+    # conversion is never picked up
+    data_tmp, index_tmp = data_path + '.tmp', index_path + '.tmp'
+    try:
+        with open(data_tmp, 'wb') as data_file, open(index_tmp, 'wb') as index_file:
+            data_file.write(header)
+            index_file.write(_DTC_INDEX_HEADER.pack(len(header)))
+            for entry in dtc_database['codes']:
+                blob = _encode_json(entry)
+                data_file.write(blob)
+                index_file.write(_DTC_INDEX_RECORD.pack(entry['code'].encode('ascii'), offset, len(blob)))
+                offset += len(blob)
+        os.replace(data_tmp, data_path)
+        os.replace(index_tmp, index_path)
+    except BaseException:
+        for path in (data_tmp, index_tmp):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+
+def _packed_dtc_database_is_current(index_path, data_path, json_path):
+    """Check that the packed DTC database exists and is not older than its JSON source."""
+    try:
+        packed_time = min(os.path.getmtime(index_path), os.path.getmtime(data_path))
+    except OSError:
+        return False
+    try:
+        return packed_time >= os.path.getmtime(json_path)
+    except OSError:
+        return True
+
+def _map_dtc_database(index_path, data_path):
+    """Map a packed DTC database, returning (mmap, {code: (offset, length)}, header).
+    
+    Raises an exception if the files are damaged or were written in another format.
+    """
+    with open(index_path, 'rb') as f:
+        index = f.read()
+    (header_length,) = _DTC_INDEX_HEADER.unpack_from(index)
+    offsets = {
+        code.rstrip(b'\0').decode('ascii'): (offset, length)
+        for code, offset, length in _DTC_INDEX_RECORD.iter_unpack(index[_DTC_INDEX_HEADER.size:])
+    }
+    with open(data_path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        end = max((offset + length for offset, length in offsets.values()), default=header_length)
+        if header_length > len(data) or end > len(data):
+            raise ValueError(f"{data_path} is shorter than its index")
+        header = _decode_json(data[:header_length])
+        if not isinstance(header, dict) or 'codes' not in header:
+            raise ValueError(f"{data_path} has no database header")
+    except BaseException:
+        data.close()
+        raise
+    return data, offsets, header
+
+class _PackedDTCCodes(Sequence):
+    """Read-only list of a packed DTC database's entries, decoded on access."""
+    
+    def __init__(self, codes, get_dtc):
+        self._codes = tuple(codes)
+        self._get_dtc = get_dtc
+    
+    def __len__(self):
+        return len(self._codes)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get_dtc(code) for code in self._codes[index]]
+        return self._get_dtc(self._codes[index])
+
+class _BitWriter:
+    """Append-only big-endian bit buffer."""
+    
+    def __init__(self):
+        self.buffer = bytearray()
+        self.acc = 0
+        self.nbits = 0
+    
+    def write(self, value, nbits):
+        """Write the low nbits of value."""
+        self.acc = (self.acc << nbits) | (value & ((1 << nbits) - 1))
+        self.nbits += nbits
+        while self.nbits >= 8:
+            self.nbits -= 8
+            self.buffer.append(self.acc >> self.nbits)
+            self.acc &= (1 << self.nbits) - 1
+    
+    def getvalue(self):
+        """Return the written bits, zero-padded to a whole byte."""
+        if self.nbits:
+            return bytes(self.buffer) + bytes([self.acc << (8 - self.nbits)])
+        return bytes(self.buffer)
+
+class _BitReader:
+    """Sequential big-endian bit reader over bytes written by _BitWriter."""
+    
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.acc = 0
+        self.nbits = 0
+    
+    def read(self, nbits):
+        """Read nbits as an unsigned integer."""
+        while self.nbits < nbits:
+            self.acc = (self.acc << 8) | self.data[self.pos]
+            self.pos += 1
+            self.nbits += 8
+        self.nbits -= nbits
+        value = self.acc >> self.nbits
+        self.acc &= (1 << self.nbits) - 1
+        return value
+    
+    def read_signed(self, nbits):
+        """Read nbits as a two's complement integer."""
+        value = self.read(nbits)
+        return value - (1 << nbits) if value >> (nbits - 1) else value
+
+def gorilla_encode(timestamps, values):
+    """Compress a sample series with Facebook's Gorilla encoding.
+    
+    Timestamps are stored as delta-of-deltas at millisecond resolution and
+    values as the XOR with the previous value, so slowly changing sensor
+    readings take only a few bits per sample.
+    """
+    writer = _BitWriter()
+    value_bits = array('Q', array('d', values).tobytes())
+    prev_ts = prev_delta = prev_bits = 0
+    prev_lead = prev_trail = None
+    
+    for i, (timestamp, bits) in enumerate(zip(timestamps, value_bits)):
+        timestamp = round(timestamp * 1000)
+        if i == 0:
+            writer.write(timestamp, 64)
+            writer.write(bits, 64)
+            prev_ts, prev_bits = timestamp, bits
+            continue
+        
+        # Timestamp: delta-of-delta in the smallest bucket that holds it
+        delta = timestamp - prev_ts
+        dod = delta - prev_delta
+        if dod == 0:
+            writer.write(0, 1)
+        elif -64 <= dod < 64:
+            writer.write(0b10, 2)
+            writer.write(dod, 7)
+        elif -256 <= dod < 256:
+            writer.write(0b110, 3)
+            writer.write(dod, 9)
+        elif -2048 <= dod < 2048:
+            writer.write(0b1110, 4)
+            writer.write(dod, 12)
+        else:
+            writer.write(0b1111, 4)
+            writer.write(dod, 64)
+        prev_ts, prev_delta = timestamp, delta
+        
+        # Value: XOR with the previous value, reusing the previous window when it fits
+        xor = bits ^ prev_bits
+        if xor == 0:
+            writer.write(0, 1)
+        else:
+            lead = min(64 - xor.bit_length(), 31)
+            trail = (xor & -xor).bit_length() - 1
+            if prev_lead is not None and lead >= prev_lead and trail >= prev_trail:
+                writer.write(0b10, 2)
+                writer.write(xor >> prev_trail, 64 - prev_lead - prev_trail)
+            else:
+                meaningful = 64 - lead - trail
+                writer.write(0b11, 2)
+                writer.write(lead, 5)
+                writer.write(meaningful, 6)  # 64 wraps to 0
+                writer.write(xor >> trail, meaningful)
+                prev_lead, prev_trail = lead, trail
+        prev_bits = bits
+    
+    return writer.getvalue()
+
+def gorilla_decode(data, count):
+    """Decompress count samples written by gorilla_encode into (timestamps, values) arrays."""
+    timestamps = array('d')
+    value_bits = array('Q')
+    if count:
+        reader = _BitReader(data)
+        timestamp = reader.read(64)
+        bits = reader.read(64)
+        delta = lead = trail = 0
+        timestamps.append(timestamp / 1000)
+        value_bits.append(bits)
+        
+        for _ in range(count - 1):
+            if not reader.read(1):
+                dod = 0
+            elif not reader.read(1):
+                dod = reader.read_signed(7)
+            elif not reader.read(1):
+                dod = reader.read_signed(9)
+            elif not reader.read(1):
+                dod = reader.read_signed(12)
+            else:
+                dod = reader.read_signed(64)
+            delta += dod
+            timestamp += delta
+            
+            if reader.read(1):
+                if reader.read(1):
+                    lead = reader.read(5)
+                    trail = 64 - lead - (reader.read(6) or 64)
+                bits ^= reader.read(64 - lead - trail) << trail
+            timestamps.append(timestamp / 1000)
+            value_bits.append(bits)
+    
+    return timestamps, array('d', value_bits.tobytes())
+
+def _compress_samples(param):
+    """Replace a session parameter's sample arrays with a Gorilla-encoded blob."""
+    return {
+        'name': param['name'],
+        'unit': param['unit'],
+        'encoding': 'gorilla',
+        'samples': len(param['val']),
+        'data': base64.b64encode(gorilla_encode(param['ts'], param['val'])).decode('ascii'),
+        'status': param['status']
+    }
+
+def decompress_samples(param):
+    """Decode a saved Gorilla-encoded session parameter into timestamp and value arrays.
+    
+    Per-sample statuses are not stored; they follow from the values via
+    classify_parameter_value.
+    """
+    timestamps, values = gorilla_decode(base64.b64decode(param['data']), param['samples'])
+    return {
+        'name': param['name'],
+        'unit': param['unit'],
+        'ts': timestamps,
+        'val': values,
+        'status': param['status']
+    }
+
+@functools.lru_cache(maxsize=HISTORY_SIZE)
+def _format_timestamp(timestamp):
+    """Format a wall-clock timestamp as an ISO 8601 string.
+    
+    Every parameter polled in one tick shares the tick's timestamp, so a snapshot
+    formats each tick once and the other parameters hit the cache.
+    """
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+def _serialize_samples(param):
+    """Expand a session parameter's parallel sample arrays into a list of value records."""
+    return {
+        'name': param['name'],
+        'unit': param['unit'],
+        'values': [
+            {
+                'value': None if math.isnan(value) else value,
+                'timestamp': _format_timestamp(timestamp),
+                'status': STATUS_NAMES[status] if status != STATUS_UNKNOWN else 'unknown'
+            }
+            for timestamp, value, status in zip(param['ts'], param['val'], param['st'])
+        ],
+        'status': param['status']
+    }
+
+def _serialize_monitoring_data(value):
+    """Copy monitoring data for output.
+    
+    Float 'timestamp' fields become ISO strings and session parameters' sample
+    arrays are expanded into value records.
+    """
+    if isinstance(value, dict):
+        if isinstance(value.get('val'), array):
+            return _serialize_samples(value)
+        return {
+            key: _format_timestamp(item)
+            if key == 'timestamp' and isinstance(item, float) else _serialize_monitoring_data(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, deque)):
+        return [_serialize_monitoring_data(item) for item in value]
+    return value
+
 class VehicleMonitor:
     """Class for monitoring vehicle parameters and health."""
     
@@ -256,12 +757,28 @@ class VehicleMonitor:
         self.active_profile = profile
         self.monitoring_active = False
         self.current_values = {}
-        self.historical_data = {}
-        self.alerts = []
+        self.alerts = deque(maxlen=ALERT_HISTORY_SIZE)
         self.last_poll_time = {}
+        self._resolved_params = []
+        self._alert_status = STATUS_WARNING
+        self._due_heap = []
+        
+        # Per-parameter history ring buffers: timestamps and values in parallel
+        # arrays, the next write position and the number of samples held
+        self._hist_ts = {}
+        self._hist_val = {}
+        self._hist_idx = {}
+        self._hist_count = {}
         self.dtc_database_file = '/home/ubuntu/obd_guide_enhanced/dtc_database/dtc_database.json'
         self.solution_database_file = '/home/ubuntu/obd_guide_enhanced/dtc_database/solution_database.json'
         self.monitoring_data_file = '/home/ubuntu/obd_guide_enhanced/dtc_database/monitoring_data.json'
+        self.monitoring_log_file = '/home/ubuntu/obd_guide_enhanced/dtc_database/monitoring_data.ndjson'
+        self._last_checkpoint = 0
+        
+        # Samples are appended to the NDJSON log by a background writer so the
+        # poll loop never waits on disk; the writer runs for the length of a session
+        self._write_q = queue.Queue()
+        self._writer = None
         
         # Load DTC and solution databases
         self.load_databases()
@@ -270,20 +787,119 @@ class VehicleMonitor:
         self.initialize_monitoring_data()
     
     def load_databases(self):
-        """Load DTC and solution databases."""
+        """Load the DTC database; the solution database is loaded on first use."""
+        self._load_dtc()
+        
+        # Drop any cached solution database so it is reloaded from the current file
+        self.__dict__.pop('solution_database', None)
+    
+    def _load_dtc(self):
+        """Load the DTC database and build its lookup structures."""
+        dtc_base = os.path.splitext(self.dtc_database_file)[0]
+        dtc_index_file, dtc_data_file = dtc_base + '.idx', dtc_base + '.dat'
+        self._dtc_data = None
+        self._dtc_offsets = {}
+        self._dtc_index = {}
+        needs_packing = False
         try:
-            with open(self.dtc_database_file, 'r', encoding='utf-8') as f:
-                self.dtc_database = json.load(f)
+            mapped = False
+            if _packed_dtc_database_is_current(dtc_index_file, dtc_data_file, self.dtc_database_file):
+                # Map the packed database; entries are decoded on first access. A damaged
+                # pack falls back to the JSON and is rebuilt from it
+                try:
+                    self._dtc_data, self._dtc_offsets, header = _map_dtc_database(dtc_index_file, dtc_data_file)
+                    header['codes'] = _PackedDTCCodes(self._dtc_offsets, self._get_dtc)
+                    self.dtc_database = header
+                    mapped = True
+                except Exception as e:
+                    print(f"Error reading packed DTC database, rebuilding it: {e}")
+                    self._dtc_data = None
+                    self._dtc_offsets = {}
             
-            with open(self.solution_database_file, 'r', encoding='utf-8') as f:
-                self.solution_database = json.load(f)
+            if not mapped:
+                self.dtc_database = _read_json(self.dtc_database_file)
+                
+                # Index the codes so lookups by code are a single dict access
+                self._dtc_index = {entry['code']: entry for entry in self.dtc_database['codes']}
+                needs_packing = True
             
             print(f"Loaded DTC database with {self.dtc_database['metadata']['total_codes']} codes")
-            print(f"Loaded solution database with {self.solution_database['metadata']['total_solutions']} solutions")
         except Exception as e:
-            print(f"Error loading databases: {e}")
+            print(f"Error loading DTC database: {e}")
             self.dtc_database = {'metadata': {'total_codes': 0}, 'codes': []}
-            self.solution_database = {'metadata': {'total_solutions': 0}, 'solutions': {}}
+            self._dtc_data = None
+            self._dtc_offsets = {}
+            self._dtc_index = {}
+            needs_packing = False
+        
+        # Pack the database so later startups can map it instead of parsing JSON;
+        # a failure here only costs that speedup, never the loaded database
+        if needs_packing:
+            try:
+                convert_dtc_database(self.dtc_database, dtc_index_file, dtc_data_file)
+            except Exception as e:
+                print(f"Error packing DTC database: {e}")
+        
+        # Character trie over the codes for prefix searches; a code sits under the '' key
+        self._dtc_trie = {}
+        for code in self._dtc_offsets or self._dtc_index:
+            node = self._dtc_trie
+            for char in code:
+                node = node.setdefault(char, {})
+            node[''] = code
+    
+    @functools.cached_property
+    def solution_database(self):
+        """The solution database, loaded the first time it is needed."""
+        try:
+            solution_database = _read_json(self.solution_database_file)
+            print(f"Loaded solution database with {solution_database['metadata']['total_solutions']} solutions")
+            return solution_database
+        except Exception as e:
+            print(f"Error loading solution database: {e}")
+            return {'metadata': {'total_solutions': 0}, 'repair_catalog': {}, 'solutions': {}}
+    
+    def get_solution_for_dtc(self, code):
+        """Return the solution for a DTC with its repair procedures resolved, or None."""
+        solution = self.solution_database['solutions'].get(code.strip().upper())
+        if solution is None:
+            return None
+        
+        # Solutions reference a shared repair catalog entry rather than embedding it
+        repairs = self.solution_database.get('repair_catalog', {}).get(solution.get('repair_ref'), [])
+        return {**solution, 'repairs': repairs}
+    
+    def find_dtc(self, code):
+        """Look up a DTC entry by its code, returning None if the code is unknown."""
+        return self._get_dtc(code.strip().upper())
+    
+    def _get_dtc(self, code):
+        """Return the entry for an exact code, decoding it from the mapped data on first use."""
+        entry = self._dtc_index.get(code)
+        if entry is None and code in self._dtc_offsets:
+            offset, length = self._dtc_offsets[code]
+            entry = self._dtc_index[code] = _decode_json(self._dtc_data[offset:offset + length])
+        return entry
+    
+    def find_by_prefix(self, prefix):
+        """Return the DTC entries whose code starts with prefix (e.g. 'P03'), in code order."""
+        node = self._dtc_trie
+        for char in prefix.strip().upper():
+            node = node.get(char)
+            if node is None:
+                return []
+        
+        # Depth-first walk, pushing children in reverse so codes come out sorted
+        entries = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for char in sorted(node, reverse=True):
+                if char:
+                    stack.append(node[char])
+            if '' in node:
+                entries.append(self._get_dtc(node['']))
+        return entries
     
     def initialize_monitoring_data(self):
         """Initialize the monitoring data structure."""
@@ -305,8 +921,8 @@ class VehicleMonitor:
                 'start_time': '',
                 'duration': 0,
                 'parameters': {},
-                'alerts': [],
-                'dtcs': []
+                'alerts': deque(maxlen=ALERT_HISTORY_SIZE),
+                'dtcs': deque(maxlen=ALERT_HISTORY_SIZE)
             },
             'historical_sessions': []
         }
@@ -323,10 +939,12 @@ class VehicleMonitor:
             'year': year,
             'engine': engine
         }
-        self.save_monitoring_data()
     
     def start_monitoring(self, profile='STANDARD'):
         """Start monitoring with the specified profile."""
+        if profile not in _PROFILE_NAMES:
+            raise ValueError(f"Unknown monitoring profile: {profile!r} (expected one of {', '.join(MONITORING_PROFILES)})")
+        
         if self.monitoring_active:
             print("Monitoring is already active. Stop monitoring first.")
             return False
@@ -336,52 +954,60 @@ class VehicleMonitor:
         
         # Update monitoring data
         self.monitoring_data['metadata']['active_profile'] = profile
-        self.monitoring_data['metadata']['monitoring_start_time'] = datetime.now().isoformat()
+        start_time = datetime.now().isoformat()
+        self.monitoring_data['metadata']['monitoring_start_time'] = start_time
         
         self.monitoring_data['current_session'] = {
-            'start_time': datetime.now().isoformat(),
+            'start_time': start_time,
             'duration': 0,
             'parameters': {},
-            'alerts': [],
-            'dtcs': []
+            'alerts': deque(maxlen=ALERT_HISTORY_SIZE),
+            'dtcs': deque(maxlen=ALERT_HISTORY_SIZE)
         }
         
         # Initialize current values and historical data
         self.current_values = {}
-        self.historical_data = {}
-        self.alerts = []
+        self.alerts = deque(maxlen=ALERT_HISTORY_SIZE)
         self.last_poll_time = {}
+        self._hist_ts = {}
+        self._hist_val = {}
+        self._hist_idx = {}
+        self._hist_count = {}
+        
+        # The profile's parameters were resolved to PolledParam entries at import
+        self._resolved_params = MONITORING_PROFILES[profile]['parameters']
+        
+        self._alert_status = ALERT_LEVELS[MONITORING_PROFILES[profile]['alert_threshold']]
+        
+        # (next_due_ns, profile_order, info) entries on the monotonic clock; everything
+        # is due on the first tick
+        self._due_heap = [(0, order, info) for order, info in enumerate(self._resolved_params)]
         
         # Initialize parameters based on profile
-        profile_params = MONITORING_PROFILES[profile]['parameters']
-        for param_path in profile_params:
-            category, param = param_path.split('.')
-            param_info = MONITORING_PARAMETERS[category][param]
+        for info in self._resolved_params:
+            param_path = info.path
             
             # Initialize current values
             self.current_values[param_path] = {
                 'value': None,
-                'unit': param_info['unit'],
+                'unit': info.unit,
                 'timestamp': None,
                 'status': 'unknown'
             }
             
             # Initialize historical data
-            self.historical_data[param_path] = []
+            self._hist_ts[param_path] = array('d', bytes(8 * HISTORY_SIZE))
+            self._hist_val[param_path] = array('d', bytes(8 * HISTORY_SIZE))
+            self._hist_idx[param_path] = 0
+            self._hist_count[param_path] = 0
             
             # Initialize last poll time
             self.last_poll_time[param_path] = 0
-            
-            # Initialize parameter in monitoring data
-            self.monitoring_data['current_session']['parameters'][param_path] = {
-                'name': param_info['name'],
-                'unit': param_info['unit'],
-                'values': [],
-                'status': 'unknown'
-            }
         
+        self._last_checkpoint = time.monotonic_ns()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
         print(f"Started monitoring with profile: {MONITORING_PROFILES[profile]['name']}")
-        self.save_monitoring_data()
         return True
     
     def stop_monitoring(self):
@@ -395,8 +1021,12 @@ class VehicleMonitor:
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
         
-        # Update session data
+        # Update session data, compressing each parameter's samples for storage
         self.monitoring_data['current_session']['duration'] = duration
+        self.monitoring_data['current_session']['parameters'] = {
+            param_path: _compress_samples(param)
+            for param_path, param in self._session_parameters().items()
+        }
         
         # Add current session to historical sessions
         self.monitoring_data['historical_sessions'].append(self.monitoring_data['current_session'])
@@ -406,55 +1036,261 @@ class VehicleMonitor:
             'start_time': '',
             'duration': 0,
             'parameters': {},
-            'alerts': [],
-            'dtcs': []
+            'alerts': deque(maxlen=ALERT_HISTORY_SIZE),
+            'dtcs': deque(maxlen=ALERT_HISTORY_SIZE)
         }
         
-        # Update monitoring status
+        # Update monitoring status and wait for queued samples to reach the log
         self.monitoring_active = False
+        self._write_q.put(_WRITER_STOP)
+        self._writer.join()
+        self._writer = None
         
         print(f"Stopped monitoring. Session duration: {duration:.1f} seconds")
         self.save_monitoring_data()
         return True
     
+    def close(self):
+        """Stop any active session, flushing queued samples and alerts to the log."""
+        if self.monitoring_active:
+            self.stop_monitoring()
+    
     def update_parameters(self):
         """Update all parameters based on the active profile."""
         if not self.monitoring_active:
             print("Monitoring is not active.")
             return False
         
-        # Get current time
+        # Schedule on the monotonic clock; samples are stamped with wall-clock time
+        now_ns = time.monotonic_ns()
         current_time = time.time()
         
-        # Get parameters for the active profile
-        profile_params = MONITORING_PROFILES[self.active_profile]['parameters']
+        # Pop every parameter whose polling interval has elapsed, keeping profile order
+        due = []
+        while self._due_heap and self._due_heap[0][0] <= now_ns:
+            _, order, info = heapq.heappop(self._due_heap)
+            due.append((order, info))
+        due.sort()
+        
+        # Read all due parameters in one pass
+        if self.obd_interface:
+            # Use actual OBD interface if available
+            values = self.get_parameters_from_obd([info.pid for _, info in due])
+        else:
+            # Simulate values for demonstration
+            values = {info.pid: self.simulate_parameter_value(info.path) for _, info in due}
+        
+        # Classify all due readings together
+        due_values = [values[info.pid] for _, info in due]
+        codes = classify_values([info.thresholds for _, info in due], due_values)
         
-        # Update each parameter
-        for param_path in profile_params:
-            category, param = param_path.split('.')
-            param_info = MONITORING_PARAMETERS[category][param]
+        for (order, info), value, code in zip(due, due_values, codes):
+            param_path = info.path
+            status = STATUS_NAMES[code] if code != STATUS_UNKNOWN else 'unknown'
             
-            # Check if it's time to poll this parameter
-            if current_time - self.last_poll_time.get(param_path, 0) >= param_info['polling_rate']:
-                # Update last poll time
-                self.last_poll_time[param_path] = current_time
-                
-                # Get parameter value
-                if self.obd_interface:
-                    # Use actual OBD interface if available
-                    value = self.get_parameter_from_obd(param_info['pid'])
-                else:
-                    # Simulate value for demonstration
-                    value = self.simulate_parameter_value(param_path)
-                
-                # Update current value
-                self.current_values[param_path] = {
-                    'value': value,
-                    'unit': param_info['unit'],
-                    'timestamp': datetime.now().isoformat(),
-                    'status': self.determine_parameter_status(param_path, value)
-                }
-                
-                # Add to historical data
-                self.historical_data[param_path].append
-(Content truncated due to size limit. Use line ranges to read in chunks)
\ No newline at end of file
+            # Schedule the next poll; last_poll_time stays in wall-clock seconds for readers
+            self.last_poll_time[param_path] = current_time
+            heapq.heappush(self._due_heap, (now_ns + info.polling_rate_ns, order, info))
+            
+            # Update current value
+            self.current_values[param_path] = {
+                'value': value,
+                'unit': info.unit,
+                'timestamp': current_time,
+                'status': status
+            }
+            
+            # Add to historical data, overwriting the oldest sample once full
+            position = self._hist_idx[param_path]
+            self._hist_ts[param_path][position] = current_time
+            self._hist_val[param_path][position] = value if value is not None else math.nan
+            self._hist_idx[param_path] = (position + 1) % HISTORY_SIZE
+            if self._hist_count[param_path] < HISTORY_SIZE:
+                self._hist_count[param_path] += 1
+            
+            # Append the sample to the log
+            self._write_q.put_nowait((param_path, current_time, value))
+            
+            # Raise an alert if the parameter has reached the profile's alert threshold
+            if code >= self._alert_status:
+                self.record_alert(info)
+        
+        # Periodically checkpoint the full monitoring data
+        if now_ns - self._last_checkpoint >= CHECKPOINT_INTERVAL_NS:
+            self._last_checkpoint = now_ns
+            self.save_monitoring_data()
+        
+        return True
+    
+    def record_alert(self, info):
+        """Record an alert for a parameter's current value."""
+        current = self.current_values[info.path]
+        alert = {
+            'parameter': info.path,
+            'name': info.name,
+            'value': current['value'],
+            'unit': info.unit,
+            'status': current['status'],
+            'timestamp': current['timestamp']
+        }
+        self.alerts.append(alert)
+        self.monitoring_data['current_session']['alerts'].append(alert)
+        self.monitoring_data['metadata']['total_alerts'] += 1
+        self._write_q.put_nowait(alert)
+        print(f"ALERT: {info.name} is {current['status']} ({current['value']} {info.unit})")
+    
+    def get_parameter_statistics(self, param_path):
+        """Get min, max and average of a parameter's recorded history."""
+        count = self._hist_count.get(param_path, 0)
+        values = [value for value in self._hist_val[param_path][:count] if not math.isnan(value)] if count else []
+        if not values:
+            return {'min': None, 'max': None, 'avg': None, 'samples': 0}
+        
+        return {
+            'min': min(values),
+            'max': max(values),
+            'avg': math.fsum(values) / len(values),
+            'samples': len(values)
+        }
+    
+    def determine_parameter_status(self, param_path, value):
+        """Determine the status name of a single value for any parameter path.
+        
+        Public helper for callers outside the poll loop, which classifies each
+        tick's readings together with classify_values. Missing (None or NaN)
+        values are 'unknown', as in the poll loop.
+        """
+        if value is None or value != value:
+            return 'unknown'
+        return STATUS_NAMES[classify_parameter_value(PARAMETER_INDEX[param_path], value)]
+    
+    def get_parameter_from_obd(self, pid):
+        """Read a parameter value from the OBD interface."""
+        try:
+            return self.obd_interface.query(pid)
+        except Exception as e:
+            print(f"Error reading PID {pid}: {e}")
+            return None
+    
+    def get_parameters_from_obd(self, pids):
+        """Read several parameters, returning a {pid: value} mapping.
+        
+        Interfaces providing query_multiple(pids) are sent one request per group of
+        up to OBD_MAX_PIDS_PER_REQUEST PIDs sharing a mode (e.g. '01 0C 0D 05') and
+        return a {pid: value} mapping; others are queried one PID at a time.
+        """
+        query_multiple = getattr(self.obd_interface, 'query_multiple', None)
+        if query_multiple is None:
+            return {pid: self.get_parameter_from_obd(pid) for pid in pids}
+        
+        # Group PIDs by mode (the first two hex digits)
+        pids_by_mode = {}
+        for pid in pids:
+            pids_by_mode.setdefault(pid[:2], []).append(pid)
+        
+        values = {}
+        for mode_pids in pids_by_mode.values():
+            for start in range(0, len(mode_pids), OBD_MAX_PIDS_PER_REQUEST):
+                request = mode_pids[start:start + OBD_MAX_PIDS_PER_REQUEST]
+                try:
+                    values.update(query_multiple(request))
+                except Exception as e:
+                    print(f"Error reading PIDs {' '.join(request)}: {e}")
+        return {pid: values.get(pid) for pid in pids}
+    
+    def simulate_parameter_value(self, param_path):
+        """Simulate a parameter value within its normal range."""
+        index = PARAMETER_INDEX[param_path]
+        min_normal, max_normal = PARAMETER_THRESHOLDS[index][:2]
+        if max_normal == math.inf:
+            # Counters such as run time simply grow between polls
+            previous = self.current_values[param_path]['value'] or min_normal
+            return previous + POLLING_RATES[index]
+        
+        # Mostly normal readings with the occasional excursion
+        value = random.gauss((min_normal + max_normal) / 2, (max_normal - min_normal) / 5)
+        return round(value, 2)
+    
+    def _writer_loop(self):
+        """Append queued samples and alerts to the NDJSON log, writing whatever is waiting as one batch.
+        
+        Samples are queued as (param_path, timestamp, value) tuples and alerts as
+        dicts, which are written with an 'event': 'alert' field.
+        """
+        running = True
+        while running:
+            batch = [self._write_q.get()]
+            while True:
+                try:
+                    batch.append(self._write_q.get_nowait())
+                except queue.Empty:
+                    break
+            
+            # Write everything queued ahead of the stop marker, then exit
+            if any(item is _WRITER_STOP for item in batch):
+                running = False
+                batch = [item for item in batch if item is not _WRITER_STOP]
+            
+            try:
+                with open(self.monitoring_log_file, 'a', encoding='utf-8') as f:
+                    f.writelines(
+                        json.dumps({'event': 'alert', **item} if isinstance(item, dict) else
+                                   {'parameter': item[0], 'timestamp': item[1], 'value': item[2]}) + '\n'
+                        for item in batch
+                    )
+            except Exception as e:
+                print(f"Error writing monitoring log: {e}")
+    
+    def _history(self, param_path):
+        """Return a parameter's recorded (timestamps, values) arrays, oldest first."""
+        count = self._hist_count.get(param_path, 0)
+        timestamps, values = self._hist_ts[param_path], self._hist_val[param_path]
+        if count < HISTORY_SIZE:
+            return timestamps[:count], values[:count]
+        position = self._hist_idx[param_path]
+        return timestamps[position:] + timestamps[:position], values[position:] + values[:position]
+    
+    def _session_parameters(self):
+        """Render the running session's parameters from the history buffers and current values.
+        
+        Each entry has parallel 'ts', 'val' and 'st' arrays; statuses are derived
+        from the values rather than stored per sample.
+        """
+        parameters = {}
+        for info in self._resolved_params:
+            timestamps, values = self._history(info.path)
+            parameters[info.path] = {
+                'name': info.name,
+                'unit': info.unit,
+                'ts': timestamps,
+                'val': values,
+                'st': classify_values([info.thresholds] * len(values), values),
+                'status': self.current_values[info.path]['status']
+            }
+        return parameters
+    
+    def save_monitoring_data(self):
+        """Save a full snapshot of the monitoring data to a JSON file."""
+        try:
+            monitoring_data = self.monitoring_data
+            if self.monitoring_active:
+                # The running session's samples live in the history buffers until written
+                current_session = dict(monitoring_data['current_session'], parameters=self._session_parameters())
+                monitoring_data = dict(monitoring_data, current_session=current_session)
+            _write_json(self.monitoring_data_file, _serialize_monitoring_data(monitoring_data))
+        except Exception as e:
+            print(f"Error saving monitoring data: {e}")
+
+def main():
+    """Run a short simulated monitoring session."""
+    monitor = VehicleMonitor()
+    monitor.start_monitoring('DIAGNOSTIC')
+    
+    for _ in range(5):
+        monitor.update_parameters()
+        time.sleep(1)
+    
+    monitor.close()
+
+if __name__ == "__main__":
+    main()